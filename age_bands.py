@@ -0,0 +1,87 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Spreadsheet exports turned "5-9" and "10-14" into dates in LGA_population_data.csv
+COLUMN_ALIASES = {'5-Sep': (5, 9), 'Oct-14': (10, 14)}
+
+# Function to list the five-year age columns, in order from 0-4 to 85 and over
+def age_columns(data):
+    columns = data.columns
+    return list(columns[columns.get_loc('LGA') + 1:columns.get_loc('Total Population')])
+
+# Function to get the (lower, upper) ages covered by a column; upper is None when open-ended
+def column_bounds(column):
+    if column in COLUMN_ALIASES:
+        return COLUMN_ALIASES[column]
+    if column.endswith(' and over'):
+        return int(column.split()[0]), None
+    lower, upper = column.split('-')
+    return int(lower), int(upper)
+
+# Function to parse a band such as "0-14", "65+" or "85 and over" into age bounds
+def parse_band(band):
+    band = band.strip()
+    match = re.fullmatch(r'(\d+)\s*(?:\+|and over)', band)
+    if match:
+        return int(match.group(1)), None
+    match = re.fullmatch(r'(\d+)\s*-\s*(\d+)', band)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    raise ValueError(f"Could not parse age band '{band}'. Use forms like 0-14 or 65+.")
+
+# Function to find the first and last column index that make up a band
+def band_column_range(columns, band):
+    lower, upper = parse_band(band)
+    bounds = [column_bounds(column) for column in columns]
+    starts = [i for i, (lo, _) in enumerate(bounds) if lo == lower]
+    stops = [i for i, (_, hi) in enumerate(bounds) if hi == upper]
+    if not starts or not stops or stops[0] < starts[0]:
+        edges = ', '.join(str(lo) for lo, _ in bounds)
+        raise ValueError(f"Age band '{band}' must start and end on the five-year boundaries ({edges}).")
+    return starts[0], stops[0]
+
+# Function to list the columns that make up each band, in age order
+def band_columns(columns, bands):
+    selected = []
+    for band in bands:
+        start, stop = band_column_range(columns, band)
+        selected.extend(columns[start:stop + 1])
+    return [column for column in columns if column in selected]
+
+# Function to build cumulative sums over the ordered age columns.
+# Column i of the result is the total of the first i age columns, so any contiguous
+# band is the difference of two columns.
+def age_prefix_sums(values):
+    values = np.asarray(values, dtype=np.float64)
+    prefix = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=prefix[:, 1:])
+    return prefix
+
+# Function to return a band's history from the population table in O(1) per row
+def band_history(data, band, prefix=None):
+    columns = age_columns(data)
+    if prefix is None:
+        prefix = age_prefix_sums(data[columns])
+    start, stop = band_column_range(columns, band)
+    return pd.Series(prefix[:, stop + 1] - prefix[:, start], index=data.index, name=band)
+
+# Function to combine cached per-column forecasts (yhat_<column>) into band forecasts.
+# Per-band forecasts are summed rather than refitted, which is exact for additive models
+# and gives a coherent bottom-up forecast for the others.
+def band_forecasts(forecast_data, columns, bands):
+    present = np.array([f'yhat_{column}' in forecast_data.columns for column in columns])
+    values = np.column_stack([
+        forecast_data[f'yhat_{column}'].to_numpy(dtype=np.float64) if has_column else np.zeros(len(forecast_data))
+        for column, has_column in zip(columns, present)
+    ])
+    prefix = age_prefix_sums(values)
+    missing_prefix = np.concatenate([[0], np.cumsum(~present)])
+
+    result = pd.DataFrame(index=forecast_data.index)
+    for band in bands:
+        start, stop = band_column_range(columns, band)
+        if missing_prefix[stop + 1] - missing_prefix[start]:
+            raise ValueError(f"Forecasts for every age column in band '{band}' are needed to combine it.")
+        result[f'yhat_{band}'] = prefix[:, stop + 1] - prefix[:, start]
+    return result
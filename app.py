@@ -8,6 +8,7 @@ def main():
     st.sidebar.title("Navigation")
     options = st.sidebar.radio("Choose a page:", [
         "Population Forecasting", 
+        "Population Scenarios",
         "Building Permit Analysis", 
         "Population Analysis", 
         "Vehicle Registration Forecasting", 
@@ -19,6 +20,10 @@ def main():
         import population_forecasting
         population_forecasting.run()
 
+    elif options == "Population Scenarios":
+        import population_scenarios
+        population_scenarios.run()
+
     elif options == "Building Permit Analysis":
         import building_permit_analysis
         building_permit_analysis.run()
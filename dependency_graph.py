@@ -0,0 +1,214 @@
+import bisect
+import fnmatch
+import graphlib
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from traffic_streaming import site_keys
+
+MANIFEST_PATH = 'Data/dependency_manifest.json'
+DERIVED_DIR = 'Data/derived'
+SOURCES_STAMP_PATH = os.path.join(DERIVED_DIR, 'sources.json')
+
+# Function to turn a key column into strings. Whole-number floats (a year column with
+# gaps is read as float) become integers, and missing values are labelled 'unknown'.
+def _key_strings(series):
+    if pd.api.types.is_float_dtype(series):
+        present = series.dropna()
+        if (present == np.floor(present)).all():
+            series = series.astype('Int64')
+    return series.astype(str).where(series.notna(), 'unknown')
+
+# Function to hash a source table into one content hash per partition.
+# Partition keys look like "population/Alpine/2021" so artifacts can select
+# every partition of an LGA, site or year with a key prefix.
+def partition_hashes(df, source, key_columns):
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    keys = pd.Series(source, index=df.index)
+    for column in key_columns:
+        keys = keys + '/' + _key_strings(df[column])
+    frame = pd.DataFrame({'key': keys.to_numpy(), 'hash': row_hashes})
+
+    # Row order inside a partition doesn't matter, only its contents
+    return {
+        key: hashlib.sha1(np.sort(group.to_numpy()).tobytes()).hexdigest()
+        for key, group in frame.groupby('key')['hash']
+    }
+
+# Function to partition LGA_population_data.csv by LGA and year
+def population_partitions(data):
+    return partition_hashes(data, 'population', ['LGA', 'Year'])
+
+# Function to partition traffic counts by site and year.
+# Sites use the same VicGrid94 (EPSG:3111) metre keys as traffic_streaming, so point
+# GeoDataFrames such as load_traffic_data's lon/lat output are projected first.
+def traffic_partitions(data):
+    data = data.copy()
+    if 'X' not in data.columns and 'geometry' in data.columns:
+        projected = data.to_crs(epsg=3111) if data.crs is not None else data
+        data['X'] = projected.geometry.x.to_numpy()
+        data['Y'] = projected.geometry.y.to_numpy()
+    data['SITE'] = site_keys(data['X'].to_numpy(dtype=np.float64), data['Y'].to_numpy(dtype=np.float64))
+    columns = ['X', 'Y', 'LAST_YEAR', 'AADT_ALLVE', 'SITE']
+    return partition_hashes(data[columns], 'traffic', ['SITE', 'LAST_YEAR'])
+
+# Function to partition LGA_coordinates.csv by LGA code
+def coordinate_partitions(data):
+    return partition_hashes(data, 'coordinates', ['LGA_CODE'])
+
+# Function to partition building permits by year of issue
+def permit_partitions(data):
+    data = data.copy()
+    data['issue_year'] = pd.to_datetime(data['issue_date'], errors='coerce').dt.year
+    return partition_hashes(data, 'permits', ['issue_year'])
+
+# Function to read the manifest recording what each artifact was built from
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {'artifacts': {}}
+    with open(path) as f:
+        return json.load(f)
+
+# Function to write the manifest atomically
+def save_manifest(manifest, path=MANIFEST_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=directory or '.', suffix='.tmp', delete=False) as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f.name, path)
+
+# Function to note the modification times of the sources a completed refresh hashed
+def record_sources(source_paths, stamp_path=SOURCES_STAMP_PATH):
+    stamp = {path: os.path.getmtime(path) for path in source_paths}
+    directory = os.path.dirname(stamp_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+        json.dump(stamp, f)
+    os.replace(f.name, stamp_path)
+
+# Function for pages to find a derived file built by the last refresh.
+# Returns None when the file is missing or a source changed since that refresh finished,
+# in which case the page should compute the result live instead.
+def derived_path(file_name, source_paths, stamp_path=SOURCES_STAMP_PATH):
+    path = os.path.join(DERIVED_DIR, file_name)
+    if not os.path.exists(path) or not os.path.exists(stamp_path):
+        return None
+    with open(stamp_path) as f:
+        stamp = json.load(f)
+    for source in source_paths:
+        if not os.path.exists(source) or stamp.get(source) != os.path.getmtime(source):
+            return None
+    return path
+
+# Function to check whether a partition key is selected by a prefix such as
+# "population/Alpine" or a pattern such as "population/*/2021"
+def _selects(selector, key):
+    if '*' in selector:
+        return fnmatch.fnmatchcase(key, selector)
+    return key == selector or key.startswith(selector.rstrip('/') + '/')
+
+# Function to index partition keys so selectors don't scan every key.
+# Prefix selectors use a sorted key list; patterns are narrowed by first and last segment.
+def index_partitions(current_hashes):
+    sorted_keys = sorted(current_hashes)
+    by_ends = {}
+    for key in sorted_keys:
+        segments = key.split('/')
+        by_ends.setdefault((segments[0], segments[-1]), []).append(key)
+    return {'sorted': sorted_keys, 'by_ends': by_ends}
+
+# Function to list the partition keys one selector matches
+def _matching_keys(selector, partition_index):
+    segments = selector.split('/')
+    if '*' in selector:
+        if '*' not in segments[0] and '*' not in segments[-1]:
+            candidates = partition_index['by_ends'].get((segments[0], segments[-1]), [])
+        else:
+            candidates = partition_index['sorted']
+        return [key for key in candidates if _selects(selector, key)]
+
+    sorted_keys = partition_index['sorted']
+    prefix = selector.rstrip('/')
+    matches = []
+    start = bisect.bisect_left(sorted_keys, prefix)
+    for key in sorted_keys[start:]:
+        if not key.startswith(prefix):
+            break
+        if _selects(selector, key):
+            matches.append(key)
+    return matches
+
+# Function to pick the current partition hashes an artifact reads
+def select_inputs(current_hashes, selectors, partition_index=None):
+    if partition_index is None:
+        partition_index = index_partitions(current_hashes)
+    selected = {}
+    for selector in selectors:
+        for key in _matching_keys(selector, partition_index):
+            selected[key] = current_hashes[key]
+    return selected
+
+# Function to compute the build token each artifact should have for the current data.
+# A token hashes the artifact's selected inputs together with its dependencies' tokens,
+# so any change upstream changes the token of everything downstream of it. A selector
+# that matches no partition raises, since it would silently pin the token forever.
+def build_tokens(artifacts, current_hashes, partition_index=None):
+    if partition_index is None:
+        partition_index = index_partitions(current_hashes)
+    sorter = graphlib.TopologicalSorter({name: spec.get('depends_on', []) for name, spec in artifacts.items()})
+
+    tokens = {}
+    for name in sorter.static_order():
+        if name not in artifacts:
+            raise KeyError(f"Artifact {name} is used as a dependency but not declared.")
+        spec = artifacts[name]
+        for selector in spec.get('inputs', []):
+            if not _matching_keys(selector, partition_index):
+                raise ValueError(f"Input selector '{selector}' of artifact {name} matches no partition.")
+        payload = {
+            'inputs': select_inputs(current_hashes, spec.get('inputs', []), partition_index),
+            'depends_on': {dependency: tokens[dependency] for dependency in spec.get('depends_on', [])}
+        }
+        tokens[name] = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return tokens
+
+# Function to list artifacts that need rebuilding, in build order.
+# artifacts maps a name to {'inputs': [partition selectors], 'depends_on': [artifact names]}.
+# An artifact is stale when its recorded token differs from its current one: it has never
+# been built, a selected partition was added, removed or changed, or a dependency was
+# rebuilt (or still needs rebuilding) since it was last built. Because tokens are compared
+# against the manifest, this also holds across interrupted or failed refreshes.
+def stale_artifacts(artifacts, current_hashes, manifest, tokens=None):
+    if tokens is None:
+        tokens = build_tokens(artifacts, current_hashes)
+    recorded = manifest.get('artifacts', {})
+    return [name for name, token in tokens.items() if recorded.get(name, {}).get('token') != token]
+
+# Function to rebuild only the stale artifacts and record what they were built from.
+# builders maps an artifact name to a zero-argument function producing it; on_built,
+# if given, is called with each artifact name after it is rebuilt to report progress.
+def refresh(artifacts, builders, current_hashes, manifest_path=MANIFEST_PATH, on_built=None):
+    manifest = load_manifest(manifest_path)
+    partition_index = index_partitions(current_hashes)
+    tokens = build_tokens(artifacts, current_hashes, partition_index)
+    rebuilt = []
+
+    for name in stale_artifacts(artifacts, current_hashes, manifest, tokens):
+        builders[name]()
+        spec = artifacts[name]
+        manifest['artifacts'][name] = {
+            'token': tokens[name],
+            'inputs': select_inputs(current_hashes, spec.get('inputs', []), partition_index),
+            'depends_on': sorted(spec.get('depends_on', []))
+        }
+        # Save after every build so an interrupted refresh keeps finished work
+        save_manifest(manifest, manifest_path)
+        rebuilt.append(name)
+        if on_built is not None:
+            on_built(name)
+
+    return rebuilt
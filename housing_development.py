@@ -1,12 +1,19 @@
+import os
 import streamlit as st
 import pandas as pd
 import folium
 from folium.plugins import HeatMap
 import geopandas as gpd
+import shapely
 from shapely.geometry import shape
 import json
 from sklearn.linear_model import LinearRegression
 import numpy as np
+import spatial_queries
+import traffic_forecasting
+
+CSV_PATH = 'Data/housing_development.csv'
+GEOPARQUET_PATH = 'Data/housing_development.parquet'
 
 # Function to convert JSON geometry to Shapely shape
 def json_to_geometry(json_str):
@@ -17,14 +24,52 @@ def json_to_geometry(json_str):
         st.error(f"Error parsing geometry: {e}")
         return None
 
+# Function to convert the CSV's GeoJSON text column into a WKB-encoded GeoParquet file.
+# grid_size snaps coordinates to a precision grid and simplify_tolerance reduces
+# vertex counts for map display; both are in degrees and off by default.
+def convert_to_geoparquet(csv_path=CSV_PATH, parquet_path=GEOPARQUET_PATH, grid_size=None, simplify_tolerance=None):
+    df = pd.read_csv(csv_path)
+
+    # Parse every GeoJSON string in one vectorized call; empty cells and malformed rows become None
+    geo_shape = df['geo_shape'].where(df['geo_shape'].map(lambda value: isinstance(value, str)), None)
+    geometries = shapely.from_geojson(geo_shape.to_numpy(dtype=object), on_invalid='warn')
+
+    if simplify_tolerance:
+        geometries = shapely.simplify(geometries, simplify_tolerance, preserve_topology=True)
+    if grid_size:
+        geometries = shapely.set_precision(geometries, grid_size)
+
+    # Drop the text column so the file only carries the binary geometry
+    gdf = gpd.GeoDataFrame(df.drop(columns=['geo_shape']), geometry=geometries, crs='EPSG:4326')
+    gdf.to_parquet(parquet_path, index=False)
+    return gdf
+
+# Function to load the GeoParquet file, decoding the WKB column as one array
+def load_geoparquet(parquet_path=GEOPARQUET_PATH):
+    df = pd.read_parquet(parquet_path)
+    geometries = shapely.from_wkb(df['geometry'].to_numpy(dtype=object))
+    return gpd.GeoDataFrame(df.drop(columns=['geometry']), geometry=geometries, crs='EPSG:4326')
+
 # Load data
 @st.cache_data
 def load_data():
-    df = pd.read_csv('Data/housing_development.csv')
+    # Prefer the binary copy when convert_to_geoparquet has been run since the CSV last changed
+    if os.path.exists(GEOPARQUET_PATH) and (
+        not os.path.exists(CSV_PATH) or os.path.getmtime(GEOPARQUET_PATH) >= os.path.getmtime(CSV_PATH)
+    ):
+        return load_geoparquet()
+
+    # Same schema and CRS as load_geoparquet: the text column is dropped once parsed
+    df = pd.read_csv(CSV_PATH)
     df['geometry'] = df['geo_shape'].apply(json_to_geometry)
-    gdf = gpd.GeoDataFrame(df, geometry='geometry')
+    gdf = gpd.GeoDataFrame(df.drop(columns=['geo_shape']), geometry='geometry', crs='EPSG:4326')
     return gdf
 
+# Function to index suburb centroids once per session for the proximity queries
+@st.cache_resource
+def load_suburb_index():
+    return spatial_queries.housing_suburb_index(load_data())
+
 # Forecasting function
 def forecast_development(gdf):
     years = np.arange(2012, 2020)
@@ -113,3 +158,35 @@ def run():
 
     # Add map to Streamlit
     st.components.v1.html(m._repr_html_(), height=600)
+
+    # Traffic around a suburb, answered from the KD-trees rather than a full scan
+    st.subheader("Traffic Near a Suburb")
+    suburb_index = load_suburb_index()
+    suburb_points = suburb_index['points']
+    suburb = st.selectbox("Select Suburb", options=sorted(suburb_points['suburb']), key='housing_suburb')
+    radius_km = st.slider("Radius (km)", min_value=1, max_value=20, value=2, key='housing_radius')
+
+    centroid = suburb_points[suburb_points['suburb'] == suburb].iloc[0]
+    traffic_index = traffic_forecasting.load_traffic_index(traffic_forecasting.traffic_source_path())
+    summary = spatial_queries.neighbourhood_aggregate(traffic_index, centroid['x'], centroid['y'], radius_km * 1000, 'AADT_ALLVE').iloc[0]
+    if summary['count']:
+        st.write(f"{summary['count']} count sites within {radius_km} km of {suburb}, mean AADT {summary['mean']:,.0f}")
+    else:
+        st.write(f"No count sites within {radius_km} km of {suburb}")
+
+    # Suburbs nearest to a point, e.g. one read off the map above
+    st.subheader("Suburbs Nearest to a Point")
+    lat = st.number_input("Latitude", value=-37.8136, format="%.4f", key='housing_lat')
+    lon = st.number_input("Longitude", value=144.9631, format="%.4f", key='housing_lon')
+    nearest_suburbs = spatial_queries.nearest_to_lonlat(suburb_index, lon, lat, k=5)
+    st.dataframe(nearest_suburbs[['rank', 'suburb', 'distance_m']])
+
+# Run with `python housing_development.py` to (re)build the GeoParquet copy that load_data prefers
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert housing_development.csv geometries to GeoParquet.")
+    parser.add_argument('--grid-size', type=float, default=None, help="Snap coordinates to this grid (degrees).")
+    parser.add_argument('--simplify-tolerance', type=float, default=None, help="Simplify polygons to this tolerance (degrees).")
+    args = parser.parse_args()
+    gdf = convert_to_geoparquet(grid_size=args.grid_size, simplify_tolerance=args.simplify_tolerance)
+    print(f"Wrote {len(gdf)} geometries to {GEOPARQUET_PATH}")
@@ -9,6 +9,13 @@ import matplotlib.pyplot as plt
 import folium
 from folium.plugins import HeatMap
 from branca.colormap import linear
+from request_coalescing import single_flight
+import prophet_model_store
+import age_bands
+import dependency_graph
+
+POPULATION_PATH = "Data/LGA_population_data.csv"
+COORDINATES_PATH = "Data/LGA_coordinates.csv"
 
 # Function to load the data
 def load_data(file_path):
@@ -20,18 +27,32 @@ def preprocess_data(data, age_groups):
         raise ValueError("The 'Year' column is missing from the data.")
     return data[['Year'] + age_groups]
 
-# Function to create a Prophet forecast
-def create_prophet_forecast(df, years_to_forecast):
+PROPHET_PARAMS = {'yearly_seasonality': True}
+
+# Function to turn one age column into Prophet's ds/y frame
+def to_prophet_frame(df, column):
+    prophet_df = df[['Year', column]].rename(columns={"Year": "ds", column: "y"})
+    prophet_df['ds'] = pd.to_datetime(prophet_df['ds'].astype(str), format='%Y', errors='coerce')
+    if prophet_df['ds'].isna().any():
+        raise ValueError(f"Date conversion failed for column {column}. Check the 'Year' values.")
+    return prophet_df
+
+# Function to create a Prophet forecast.
+# When lga is given, fitted models are kept in the model store per LGA/age series, and
+# uncertainty sampling is skipped unless include_intervals is set since only yhat is used.
+@single_flight
+def create_prophet_forecast(df, years_to_forecast, lga=None, include_intervals=False):
     forecast_data = pd.DataFrame()
     models = {}
     for column in df.columns[1:]:
-        prophet_df = df[['Year', column]].rename(columns={"Year": "ds", column: "y"})
-        prophet_df['ds'] = pd.to_datetime(prophet_df['ds'].astype(str), format='%Y', errors='coerce')
-        if prophet_df['ds'].isna().any():
-            raise ValueError(f"Date conversion failed for column {column}. Check the 'Year' values.")
-        model = Prophet(yearly_seasonality=True)
-        model.fit(prophet_df)
+        prophet_df = to_prophet_frame(df, column)
+        if lga is not None:
+            model = prophet_model_store.fit_or_load(prophet_df, (lga, column), PROPHET_PARAMS)
+        else:
+            model = Prophet(**PROPHET_PARAMS)
+            model.fit(prophet_df)
         future = model.make_future_dataframe(periods=years_to_forecast, freq='Y')
+        model.uncertainty_samples = 1000 if include_intervals else 0
         forecast = model.predict(future)
         forecast = forecast[['ds', 'yhat']].rename(columns={"yhat": f'yhat_{column}'})
         forecast_data = pd.concat([forecast_data, forecast.set_index('ds')], axis=1)
@@ -40,15 +61,21 @@ def create_prophet_forecast(df, years_to_forecast):
     forecast_data.reset_index(inplace=True)
     return forecast_data, models
 
+# Function to fit ARIMA to one LGA/age column, cached per LGA, column and series so
+# custom age bands reuse the per-column forecasts instead of refitting on every click
+@st.cache_data(show_spinner=False)
+def create_arima_column_forecast(lga, column, series, years_to_forecast):
+    model = ARIMA(series, order=(5,1,0))
+    model_fit = model.fit()
+    forecast = model_fit.forecast(steps=years_to_forecast)
+    return np.asarray(forecast), model_fit
+
 # Function to create an ARIMA forecast
-def create_arima_forecast(df, years_to_forecast):
+def create_arima_forecast(df, years_to_forecast, lga=None):
     forecast_data = pd.DataFrame()
     models = {}
     for column in df.columns[1:]:
-        series = df[column]
-        model = ARIMA(series, order=(5,1,0))
-        model_fit = model.fit()
-        forecast = model_fit.forecast(steps=years_to_forecast)
+        forecast, model_fit = create_arima_column_forecast(lga, column, df[column], years_to_forecast)
         future_years = pd.date_range(start=str(df['Year'].max() + 1), periods=years_to_forecast, freq='Y')
         forecast_df = pd.DataFrame({'Year': future_years.year, f'yhat_{column}': forecast})
         forecast_data = pd.concat([forecast_data, forecast_df.set_index('Year')], axis=1)
@@ -143,17 +170,18 @@ def run():
     st.title("Population Forecasting and Model Evaluation")
 
     # Load data
-    data = load_data("Data/LGA_population_data.csv")
+    data = load_data(POPULATION_PATH)
     st.write("LGA-wise Population Data", data.head())
 
     # Load coordinate data
-    coordinate_data = load_data("Data/LGA_coordinates.csv")
+    coordinate_data = load_data(COORDINATES_PATH)
     st.write("LGA Coordinates Data", coordinate_data.head())
 
     # Sidebar inputs
     years_to_forecast = st.sidebar.slider("Select Forecasting Horizon (years)", min_value=1, max_value=20, value=5, key='forecast_years')
     age_groups = st.sidebar.multiselect("Select Age Groups", options=data.columns[2:], default=["0-4", "20-24"], key='age_groups')
     lga = st.sidebar.selectbox("Select LGA", options=data['LGA'].unique(), key='lga_select')
+    custom_bands = st.sidebar.text_input("Custom Age Bands (e.g. 0-14, 15-24, 65+)", value="", key='custom_bands')
 
     selected_year = st.sidebar.slider("Select Year", min_value=2001, max_value=2041, value=2021, key='selected_year')
 
@@ -161,16 +189,26 @@ def run():
         st.write(f"Forecasting for {years_to_forecast} years...")
 
         lga_data = data[data['LGA'] == lga]
-        prepared_data = preprocess_data(lga_data, age_groups)
+
+        # Custom bands are combined from the per-column forecasts, so fit every column they span
+        all_age_columns = age_bands.age_columns(data)
+        bands = [band.strip() for band in custom_bands.split(',') if band.strip()]
+        try:
+            band_fit_columns = age_bands.band_columns(all_age_columns, bands)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        fit_columns = list(age_groups) + [column for column in band_fit_columns if column not in age_groups]
+        prepared_data = preprocess_data(lga_data, fit_columns)
 
         if prepared_data.empty:
             return
 
-        prophet_forecast_data, prophet_model = create_prophet_forecast(prepared_data, years_to_forecast)
+        prophet_forecast_data, prophet_model = create_prophet_forecast(prepared_data, years_to_forecast, lga=lga)
         st.write("**Prophet Model Forecast:**")
         st.write(prophet_forecast_data)
 
-        arima_forecast_data, arima_model = create_arima_forecast(prepared_data, years_to_forecast)
+        arima_forecast_data, arima_model = create_arima_forecast(prepared_data, years_to_forecast, lga=lga)
         st.write("**ARIMA Model Forecast:**")
         st.write(arima_forecast_data)
 
@@ -209,12 +247,26 @@ def run():
         for age_group in age_groups:
             plot_forecasts(lga_data, prophet_forecast_data, arima_forecast_data, age_group)
 
-        # Create map with population density for the selected year
-        map_ = create_map_with_population(coordinate_data, data, selected_year)
-        
-        # Display map
+        if bands:
+            st.write("**Custom Age Band Forecasts:**")
+            band_data = lga_data[['Year']].copy()
+            prefix = age_bands.age_prefix_sums(lga_data[all_age_columns])
+            for band in bands:
+                band_data[band] = age_bands.band_history(lga_data, band, prefix=prefix)
+            prophet_band_data = pd.concat([prophet_forecast_data[['ds']], age_bands.band_forecasts(prophet_forecast_data, all_age_columns, bands)], axis=1)
+            arima_band_data = pd.concat([arima_forecast_data[['Year']], age_bands.band_forecasts(arima_forecast_data, all_age_columns, bands)], axis=1)
+            for band in bands:
+                plot_forecasts(band_data, prophet_band_data, arima_band_data, band)
+
+        # Display the map rendered by the last refresh, or render it now
         st.subheader("Population Density Map")
-        st.components.v1.html(map_._repr_html_(), height=600)
+        map_path = dependency_graph.derived_path(f'population_map_{selected_year}.html', [POPULATION_PATH, COORDINATES_PATH])
+        if map_path is not None:
+            with open(map_path) as f:
+                st.components.v1.html(f.read(), height=600)
+        else:
+            map_ = create_map_with_population(coordinate_data, data, selected_year)
+            st.components.v1.html(map_._repr_html_(), height=600)
 
 if __name__ == "__main__":
     run()
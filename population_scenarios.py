@@ -0,0 +1,203 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import age_bands
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Function to load the data
+def load_data(file_path):
+    return pd.read_csv(file_path)
+
+# Function to reshape the LGA table into a (year, LGA, age band) array
+def build_population_array(data):
+    age_columns = age_bands.age_columns(data)
+    years = np.sort(data['Year'].unique())
+    lgas = np.sort(data['LGA'].unique())
+
+    pivot = data.set_index(['Year', 'LGA'])[age_columns].reindex(
+        pd.MultiIndex.from_product([years, lgas], names=['Year', 'LGA'])
+    )
+    population = pivot.to_numpy(dtype=np.float64).reshape(len(years), len(lgas), len(age_columns))
+
+    # Carry the last observed value forward for any LGA/year gaps
+    population = pd.DataFrame(population.reshape(len(years), -1)).ffill().bfill().to_numpy().reshape(population.shape)
+    return years, lgas, age_columns, population
+
+# Function to estimate log-growth drift and volatility for every LGA/age band at once.
+# Year-to-year growth is split into a state-wide component shared by all series and
+# an idiosyncratic residual, so simulated paths keep the correlation between LGAs.
+def estimate_growth_parameters(population):
+    log_growth = np.diff(np.log(np.maximum(population, 1.0)), axis=0)
+    drift = log_growth.mean(axis=0)
+
+    deviations = log_growth - drift
+    common = deviations.mean(axis=(1, 2))
+    common_sigma = common.std(ddof=1) if len(common) > 1 else 0.0
+    residuals = deviations - common[:, None, None]
+    idio_sigma = residuals.std(axis=0, ddof=1) if len(common) > 1 else np.zeros_like(drift)
+    return drift, common_sigma, idio_sigma
+
+# Function to simulate one chunk of LGAs for every path and horizon year.
+# common_shocks has shape (n_paths, horizon) and is shared by all chunks.
+def simulate_chunk(base, drift, idio_sigma, common_shocks, rng, growth_multiplier=1.0,
+                   migration_shock=0.0, shock_year_index=0, volatility_multiplier=1.0):
+    n_paths, horizon = common_shocks.shape
+
+    noise = rng.standard_normal((n_paths, horizon) + base.shape, dtype=np.float32)
+    noise *= (idio_sigma * volatility_multiplier).astype(np.float32)
+    noise += common_shocks[:, :, None, None]
+    noise += (drift * growth_multiplier).astype(np.float32)
+
+    # Migration shock is a one-off level change from the shock year onwards
+    if migration_shock:
+        noise[:, shock_year_index] += np.float32(np.log1p(migration_shock))
+
+    log_paths = np.cumsum(noise, axis=1)
+    log_paths += np.log(np.maximum(base, 1.0)).astype(np.float32)
+    return np.exp(log_paths, out=log_paths)
+
+# Function to run the Monte Carlo scenario engine.
+# LGAs are simulated chunk_size at a time so memory is bounded by
+# n_paths * horizon * chunk_size * age bands rather than by the whole state.
+def run_scenarios(data, horizon=20, n_paths=10000, chunk_size=8, growth_multiplier=1.0,
+                  migration_shock=0.0, shock_year=None, volatility_multiplier=1.0,
+                  thresholds=None, seed=None):
+    years, lgas, age_columns, population = build_population_array(data)
+    drift, common_sigma, idio_sigma = estimate_growth_parameters(population)
+
+    future_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+    shock_year_index = 0 if shock_year is None else int(shock_year - future_years[0])
+    if not 0 <= shock_year_index < horizon:
+        raise ValueError(f"Shock year {shock_year} is outside the simulated years {future_years[0]}-{future_years[-1]}.")
+
+    rng = np.random.default_rng(seed)
+    common_shocks = rng.standard_normal((n_paths, horizon), dtype=np.float32)
+    common_shocks *= np.float32(common_sigma * volatility_multiplier)
+
+    if thresholds is not None and not isinstance(thresholds, pd.Series):
+        thresholds = pd.Series(thresholds, index=lgas, dtype=float)
+
+    band_frames = []
+    lga_frames = []
+    exceedance_frames = []
+    state_totals = np.zeros((n_paths, horizon), dtype=np.float64)
+
+    for start in range(0, len(lgas), chunk_size):
+        stop = min(start + chunk_size, len(lgas))
+        paths = simulate_chunk(
+            population[-1, start:stop], drift[start:stop], idio_sigma[start:stop], common_shocks, rng,
+            growth_multiplier=growth_multiplier, migration_shock=migration_shock,
+            shock_year_index=shock_year_index, volatility_multiplier=volatility_multiplier
+        )
+        chunk_lgas = lgas[start:stop]
+
+        # Percentile bands per age band: shape (percentile, horizon, lga, age)
+        band_percentiles = np.percentile(paths, PERCENTILES, axis=0)
+        band_frames.append(_to_long_frame(band_percentiles, future_years, chunk_lgas, age_columns))
+
+        lga_totals = paths.sum(axis=3)
+        lga_percentiles = np.percentile(lga_totals, PERCENTILES, axis=0)
+        lga_frames.append(_to_long_frame(lga_percentiles[..., None], future_years, chunk_lgas, ['Total Population']))
+
+        if thresholds is not None:
+            limits = thresholds.reindex(chunk_lgas).to_numpy(dtype=np.float64)
+            probability = (lga_totals > limits[None, None, :]).mean(axis=0)
+            exceedance_frames.append(pd.DataFrame({
+                'Year': np.repeat(future_years, len(chunk_lgas)),
+                'LGA': np.tile(chunk_lgas, horizon),
+                'Threshold': np.tile(limits, horizon),
+                'Exceedance Probability': probability.ravel()
+            }))
+
+        state_totals += lga_totals.sum(axis=2)
+        del paths, lga_totals
+
+    state_percentiles = np.percentile(state_totals, PERCENTILES, axis=0)
+    state_frame = pd.DataFrame(state_percentiles.T, columns=[f'p{p}' for p in PERCENTILES])
+    state_frame.insert(0, 'Year', future_years)
+
+    return {
+        'age_bands': pd.concat(band_frames, ignore_index=True),
+        'lga_totals': pd.concat(lga_frames, ignore_index=True),
+        'state_total': state_frame,
+        'state_paths': state_totals,
+        'exceedance': pd.concat(exceedance_frames, ignore_index=True) if exceedance_frames else None
+    }
+
+# Function to flatten a (percentile, horizon, lga, age) array into a long DataFrame
+def _to_long_frame(percentiles, future_years, lgas, age_columns):
+    n_years, n_lgas, n_ages = percentiles.shape[1:]
+    frame = pd.DataFrame({
+        'Year': np.repeat(future_years, n_lgas * n_ages),
+        'LGA': np.tile(np.repeat(lgas, n_ages), n_years),
+        'Age Group': np.tile(age_columns, n_years * n_lgas)
+    })
+    for i, p in enumerate(PERCENTILES):
+        frame[f'p{p}'] = percentiles[i].ravel()
+    return frame
+
+# Function to compute the probability that the state total exceeds a value in each year
+def state_exceedance_probability(state_paths, threshold):
+    return (state_paths > threshold).mean(axis=0)
+
+# Main function for the population scenario page
+def run():
+    st.title("Population Scenario Simulation")
+
+    data = load_data("Data/LGA_population_data.csv")
+
+    # Scenario levers
+    horizon = st.sidebar.slider("Simulation Horizon (years)", min_value=1, max_value=30, value=20, key='scenario_horizon')
+    n_paths = st.sidebar.select_slider("Number of Trajectories", options=[1000, 2500, 5000, 10000], value=5000, key='scenario_paths')
+    growth_multiplier = st.sidebar.slider("Growth Multiplier", min_value=0.0, max_value=3.0, value=1.0, step=0.1, key='scenario_growth')
+    migration_shock = st.sidebar.slider("Migration Shock (%)", min_value=-20.0, max_value=20.0, value=0.0, step=0.5, key='scenario_shock') / 100
+    first_year = int(data['Year'].max()) + 1
+    if horizon > 1:
+        shock_year = st.sidebar.slider("Shock Year", min_value=first_year, max_value=first_year + horizon - 1, value=first_year, key='scenario_shock_year')
+    else:
+        shock_year = first_year
+    volatility_multiplier = st.sidebar.slider("Volatility Multiplier", min_value=0.0, max_value=3.0, value=1.0, step=0.1, key='scenario_volatility')
+    capacity_growth = st.sidebar.slider("Capacity Threshold (% above current population)", min_value=0, max_value=100, value=20, key='scenario_capacity') / 100
+
+    if st.sidebar.button("Run Simulation"):
+        latest = data[data['Year'] == data['Year'].max()].set_index('LGA')['Total Population']
+        thresholds = latest * (1 + capacity_growth)
+
+        results = run_scenarios(
+            data, horizon=horizon, n_paths=n_paths, growth_multiplier=growth_multiplier,
+            migration_shock=migration_shock, shock_year=shock_year,
+            volatility_multiplier=volatility_multiplier, thresholds=thresholds
+        )
+        # Keep the results so the LGA selector below doesn't discard them on rerun
+        st.session_state['scenario_results'] = results
+
+    if 'scenario_results' in st.session_state:
+        results = st.session_state['scenario_results']
+
+        st.subheader("Victoria Total Population Percentile Bands")
+        state_frame = results['state_total']
+        fig = px.line(state_frame, x='Year', y=[f'p{p}' for p in PERCENTILES],
+                      labels={'value': 'Population', 'variable': 'Percentile'})
+        st.plotly_chart(fig)
+
+        # State-wide capacity uses the same threshold as the LGAs, applied to the current total
+        state_capacity = data.loc[data['Year'] == data['Year'].max(), 'Total Population'].sum() * (1 + capacity_growth)
+        state_frame = state_frame.assign(**{
+            'Exceedance Probability': state_exceedance_probability(results['state_paths'], state_capacity)
+        })
+        st.write(f"Victoria capacity threshold: {state_capacity:,.0f}")
+        st.write(state_frame)
+
+        st.subheader("Probability of Exceeding Capacity by LGA")
+        exceedance = results['exceedance']
+        final_year = exceedance[exceedance['Year'] == exceedance['Year'].max()]
+        st.dataframe(final_year.sort_values('Exceedance Probability', ascending=False))
+
+        st.subheader("Age Band Percentiles")
+        lga = st.selectbox("Select LGA", options=results['age_bands']['LGA'].unique(), key='scenario_lga')
+        st.dataframe(results['age_bands'][results['age_bands']['LGA'] == lga])
+
+if __name__ == "__main__":
+    run()
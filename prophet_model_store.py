@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from prophet.serialize import model_to_json, model_from_json
+
+STORE_DIR = 'Data/prophet_models'
+
+# Function to hash a Prophet training frame so a stored model can be matched to its data
+def data_version(prophet_df, model_params):
+    digest = hashlib.sha1()
+    digest.update(json.dumps(model_params, sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(prophet_df[['ds', 'y']], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Function to map an LGA/age series key to a file in the store
+def model_path(series_key, store_dir=STORE_DIR):
+    name = re.sub(r'[^\w-]+', '_', '__'.join(str(part) for part in series_key))
+    return os.path.join(store_dir, f'{name}.json')
+
+# Function to read a stored model and the data version it was fitted on
+def load_model(series_key, store_dir=STORE_DIR):
+    path = model_path(series_key, store_dir)
+    if not os.path.exists(path):
+        return None, None
+    with open(path) as f:
+        entry = json.load(f)
+    return model_from_json(entry['model']), entry['data_version']
+
+# Function to write a fitted model to the store
+def save_model(series_key, model, version, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    path = model_path(series_key, store_dir)
+
+    # Write to a uniquely named temporary file first so concurrent readers never see a
+    # partial model and sessions (threads of one process) saving at once don't collide
+    with tempfile.NamedTemporaryFile('w', dir=store_dir, suffix='.tmp', delete=False) as f:
+        json.dump({'data_version': version, 'model': model_to_json(model)}, f)
+    os.replace(f.name, path)
+
+# Function to turn a fitted model's parameters into a Stan initialisation for a new fit.
+# The number of changepoints grows with the history, so delta is padded or trimmed to
+# the size the new fit will use.
+def warm_start_params(model, prophet_df, model_params):
+    n_changepoints = Prophet(**model_params).n_changepoints
+    hist_size = int(np.floor(len(prophet_df) * model.changepoint_range))
+    if n_changepoints + 1 > hist_size:
+        n_changepoints = max(hist_size - 1, 0)
+
+    delta = np.asarray(model.params['delta'][0], dtype=float)
+    delta = np.pad(delta, (0, max(n_changepoints - len(delta), 0)))[:n_changepoints]
+    if n_changepoints == 0:
+        delta = np.zeros(1)
+
+    return {
+        'k': float(model.params['k'][0][0]),
+        'm': float(model.params['m'][0][0]),
+        'sigma_obs': float(model.params['sigma_obs'][0][0]),
+        'delta': delta,
+        'beta': np.asarray(model.params['beta'][0], dtype=float),
+    }
+
+# Function to return a fitted model for a series, reusing or warm-starting from the store.
+# An unchanged series is loaded without refitting; a changed series is refitted starting
+# from the stored parameters; an unseen series is fitted from scratch.
+def fit_or_load(prophet_df, series_key, model_params, store_dir=STORE_DIR):
+    version = data_version(prophet_df, model_params)
+
+    try:
+        stored_model, stored_version = load_model(series_key, store_dir)
+    except (OSError, ValueError, KeyError):
+        stored_model, stored_version = None, None
+
+    if stored_model is not None and stored_version == version:
+        return stored_model
+
+    model = Prophet(**model_params)
+    if stored_model is not None:
+        try:
+            model.fit(prophet_df, init=warm_start_params(stored_model, prophet_df, model_params))
+        except Exception:
+            # Parameter shapes no longer line up (e.g. seasonality changed); fit cold instead
+            model = Prophet(**model_params)
+            model.fit(prophet_df)
+    else:
+        model.fit(prophet_df)
+
+    save_model(series_key, model, version, store_dir)
+    return model
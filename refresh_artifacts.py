@@ -0,0 +1,110 @@
+import os
+import pandas as pd
+import geopandas as gpd
+import age_bands
+import dependency_graph
+import population_forecasting
+import prophet_model_store
+import traffic_forecasting
+
+# The pages read these outputs through dependency_graph.derived_path
+DERIVED_DIR = dependency_graph.DERIVED_DIR
+TRAFFIC_FORECAST_PATH = os.path.join(DERIVED_DIR, traffic_forecasting.TRAFFIC_FORECAST_FILE)
+LAST_FORECAST_YEAR = 2041
+
+# Function to list the source files, the same ones the pages read
+def source_paths():
+    return [population_forecasting.POPULATION_PATH, population_forecasting.COORDINATES_PATH, traffic_forecasting.traffic_source_path()]
+
+# Function to load the source tables the derived artifacts are built from
+def load_sources():
+    population_path, coordinates_path, traffic_path = source_paths()
+    population = pd.read_csv(population_path)
+    coordinates = pd.read_csv(coordinates_path)
+    traffic = traffic_forecasting.load_traffic_data(traffic_path)
+    return population, coordinates, traffic
+
+# Function to fit (or warm-start) every age column of one LGA into the Prophet model store
+def build_prophet_models(population, lga):
+    lga_data = population[population['LGA'] == lga]
+    for column in age_bands.age_columns(population):
+        prophet_df = population_forecasting.to_prophet_frame(lga_data, column)
+        prophet_model_store.fit_or_load(prophet_df, (lga, column), population_forecasting.PROPHET_PARAMS)
+
+# Function to forecast every traffic site to LAST_FORECAST_YEAR and save it as GeoParquet
+def build_traffic_forecast(traffic_gdf):
+    max_year = int(traffic_gdf['LAST_YEAR'].max())
+    forecast_years = list(range(max_year + 1, LAST_FORECAST_YEAR + 1))
+    forecasted_data = traffic_forecasting.forecast_traffic_data(traffic_gdf, forecast_years)
+    if forecasted_data is None:
+        forecasted_data = traffic_gdf.iloc[0:0]
+    forecasted_data.to_parquet(TRAFFIC_FORECAST_PATH, index=False)
+
+# Function to render the traffic heatmap for one year, historical or forecast
+def build_traffic_map(traffic_gdf, year):
+    if year > traffic_gdf['LAST_YEAR'].max():
+        year_data = gpd.read_parquet(TRAFFIC_FORECAST_PATH)
+    else:
+        year_data = traffic_gdf
+    year_data = year_data[year_data['LAST_YEAR'] == year]
+    if not year_data.empty:
+        traffic_forecasting.create_traffic_map(year_data).save(os.path.join(DERIVED_DIR, f'traffic_map_{year}.html'))
+
+# Function to render the population map for one year
+def build_population_map(coordinates, population, year):
+    map_ = population_forecasting.create_map_with_population(coordinates, population, year)
+    map_.save(os.path.join(DERIVED_DIR, f'population_map_{year}.html'))
+
+# Function to declare every derived artifact, the partitions it reads and how to build it
+def declare_artifacts(population, coordinates, traffic_gdf):
+    artifacts = {}
+    builders = {}
+
+    # Prophet fits only read their own LGA, so appending a year refits LGA by LGA
+    for lga in population['LGA'].unique():
+        name = f'prophet/{lga}'
+        artifacts[name] = {'inputs': [f'population/{lga}']}
+        builders[name] = lambda lga=lga: build_prophet_models(population, lga)
+
+    for year in population['Year'].unique():
+        name = f'population_map/{year}'
+        artifacts[name] = {'inputs': [f'population/*/{year}', 'coordinates']}
+        builders[name] = lambda year=year: build_population_map(coordinates, population, year)
+
+    artifacts['traffic_forecast'] = {'inputs': ['traffic']}
+    builders['traffic_forecast'] = lambda: build_traffic_forecast(traffic_gdf)
+
+    # Historical maps read only their year's counts; forecast maps read the forecast.
+    # Rows without a LAST_YEAR are keyed 'unknown' and only feed the forecast.
+    historical_years = sorted(int(year) for year in traffic_gdf['LAST_YEAR'].dropna().unique())
+    for year in historical_years + list(range(historical_years[-1] + 1, LAST_FORECAST_YEAR + 1)):
+        name = f'traffic_map/{year}'
+        if year <= historical_years[-1]:
+            artifacts[name] = {'inputs': [f'traffic/*/{year}']}
+        else:
+            artifacts[name] = {'depends_on': ['traffic_forecast']}
+        builders[name] = lambda year=year: build_traffic_map(traffic_gdf, year)
+
+    return artifacts, builders
+
+# Function to hash the current sources and rebuild only the artifacts whose inputs changed.
+# Once every stale artifact is built, the source modification times are stamped so the
+# pages know the derived files match the data they would otherwise compute from.
+def run_refresh(manifest_path=dependency_graph.MANIFEST_PATH, on_built=None):
+    population, coordinates, traffic = load_sources()
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+
+    current_hashes = {}
+    current_hashes.update(dependency_graph.population_partitions(population))
+    current_hashes.update(dependency_graph.coordinate_partitions(coordinates))
+    current_hashes.update(dependency_graph.traffic_partitions(traffic))
+
+    artifacts, builders = declare_artifacts(population, coordinates, traffic)
+    rebuilt = dependency_graph.refresh(artifacts, builders, current_hashes, manifest_path, on_built=on_built)
+    dependency_graph.record_sources(source_paths())
+    return rebuilt
+
+# Run with `python refresh_artifacts.py` after updating the data files
+if __name__ == "__main__":
+    rebuilt = run_refresh(on_built=lambda name: print(f"  rebuilt {name}", flush=True))
+    print(f"Rebuilt {len(rebuilt)} artifacts")
@@ -0,0 +1,118 @@
+import functools
+import hashlib
+import inspect
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# In-flight computations shared by every Streamlit session in this process
+_lock = threading.Lock()
+_in_flight = {}
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# Function to tell plain numbers (Python or NumPy, excluding booleans) apart from other values
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+# Function to turn a 1-D sequence of numbers into a float64 array, or None for anything else.
+# Lists, tuples, ranges, arrays and indexes holding the same numbers hash identically.
+def _numeric_vector(value):
+    if isinstance(value, (np.ndarray, pd.Index)):
+        if value.ndim == 1 and (np.issubdtype(value.dtype, np.integer) or np.issubdtype(value.dtype, np.floating)):
+            return np.asarray(value, dtype=np.float64)
+        return None
+    if isinstance(value, (list, tuple, range)) and all(_is_number(item) for item in value):
+        return np.asarray(list(value), dtype=np.float64)
+    return None
+
+# Function to feed a normalized form of a value into the key hash.
+# DataFrames are hashed by content, so the key changes whenever the data does. Numbers
+# are hashed by value, so 5, 5.0 and np.int64(5) (and sequences of them) share a key.
+def _update_key(digest, value):
+    vector = _numeric_vector(value)
+    if _is_number(value):
+        digest.update(b'n' + repr(float(value)).encode())
+    elif vector is not None:
+        digest.update(b'v' + repr(len(vector)).encode())
+        digest.update(vector.tobytes())
+    elif isinstance(value, gpd.GeoDataFrame):
+        geometry_name = value.geometry.name
+        _update_key(digest, pd.DataFrame(value.drop(columns=[geometry_name])))
+        _update_key(digest, value.geometry.to_wkb().to_numpy())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(repr(value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple, range, np.ndarray, pd.Index)):
+        digest.update(b'[')
+        for item in value:
+            _update_key(digest, item)
+            digest.update(b',')
+        digest.update(b']')
+    elif isinstance(value, dict):
+        _update_key(digest, sorted(value.items(), key=lambda item: repr(item[0])))
+    elif isinstance(value, np.generic):
+        _update_key(digest, value.item())
+    else:
+        digest.update(repr(value).encode())
+
+# Function to build the coalescing key for a call.
+# Arguments are bound to the signature with defaults applied, so f(df, 5) and
+# f(df, years_to_forecast=5, lga=None) share a key.
+def make_key(func, args, kwargs, signature=None):
+    bound = (signature or inspect.signature(func)).bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    digest = hashlib.sha1()
+    _update_key(digest, (func.__module__, func.__qualname__))
+    _update_key(digest, dict(bound.arguments))
+    return digest.hexdigest()
+
+# Decorator so concurrent identical calls wait on one computation and share its result.
+# The result object is shared between callers, so it must be treated as read-only.
+def single_flight(func):
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = make_key(func, args, kwargs, signature)
+
+        with _lock:
+            call = _in_flight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                _in_flight[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                # Each waiter raises its own exception so tracebacks don't mix across threads
+                raise RuntimeError(f"Shared computation of {func.__qualname__} failed: {call.error!r}") from call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh computation; caching is left to st.cache_data
+            with _lock:
+                _in_flight.pop(key, None)
+            call.done.set()
+
+        return call.result
+
+    return wrapper
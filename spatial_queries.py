@@ -0,0 +1,95 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+from sklearn.neighbors import KDTree
+
+# VicGrid94 is in metres, so KD-tree distances and radii are in metres too
+PROJECTED_CRS = 'EPSG:3111'
+_to_projected = Transformer.from_crs('EPSG:4326', PROJECTED_CRS, always_xy=True)
+
+# Function to project longitude/latitude arrays to VicGrid94 metres
+def project_lonlat(lon, lat):
+    return _to_projected.transform(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+
+# Function to build a KD-tree over a frame with projected 'x'/'y' columns
+def build_index(points):
+    points = points.reset_index(drop=True)
+    tree = KDTree(points[['x', 'y']].to_numpy(dtype=np.float64))
+    return {'tree': tree, 'points': points}
+
+# Function to index traffic count sites from any point GeoDataFrame (e.g. load_traffic_data)
+def traffic_site_index(traffic_data):
+    projected = traffic_data.to_crs(PROJECTED_CRS)
+    points = pd.DataFrame(traffic_data.drop(columns=traffic_data.geometry.name))
+    points['x'] = projected.geometry.x.to_numpy()
+    points['y'] = projected.geometry.y.to_numpy()
+    return build_index(points)
+
+# Function to index LGA centroids from LGA_coordinates.csv, named from the population table
+@st.cache_resource
+def lga_centroid_index(coordinates_path='Data/LGA_coordinates.csv', population_path='Data/LGA_population_data.csv'):
+    coordinates = pd.read_csv(coordinates_path, encoding='utf-8-sig')
+    lat_lon = coordinates['Geo Point'].str.split(',', expand=True).astype(float)
+    names = pd.read_csv(population_path, encoding='utf-8-sig')[['LGA_CODE', 'LGA']].drop_duplicates('LGA_CODE')
+
+    points = coordinates[['LGA_CODE']].merge(names, on='LGA_CODE', how='left')
+    points['lat'] = lat_lon[0].to_numpy()
+    points['lon'] = lat_lon[1].to_numpy()
+    points['x'], points['y'] = project_lonlat(points['lon'], points['lat'])
+    return build_index(points)
+
+# Function to index housing development suburb centroids from housing_development.load_data
+def housing_suburb_index(housing_data):
+    gdf = housing_data[housing_data.geometry.notna()]
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=4326)
+    projected = gdf.to_crs(PROJECTED_CRS)
+
+    # One point per suburb: the centroid of all its development polygons merged together
+    centroids = projected[['suburb', projected.geometry.name]].dissolve('suburb').centroid
+    points = pd.DataFrame({'suburb': centroids.index, 'x': centroids.x.to_numpy(), 'y': centroids.y.to_numpy()})
+    return build_index(points)
+
+# Function to find the k nearest indexed points to each query point (projected metres).
+# Returns one row per match with the query number, rank and distance.
+def nearest(index, query_x, query_y, k=5):
+    queries = np.column_stack([np.atleast_1d(query_x), np.atleast_1d(query_y)]).astype(np.float64)
+    k = min(k, len(index['points']))
+    if k == 0:
+        matches = index['points'].iloc[0:0].reset_index(drop=True)
+        matches.insert(0, 'query', np.zeros(0, dtype=np.int64))
+        matches.insert(1, 'rank', np.zeros(0, dtype=np.int64))
+        matches.insert(2, 'distance_m', np.zeros(0))
+        return matches
+    distances, positions = index['tree'].query(queries, k=k)
+
+    matches = index['points'].iloc[positions.ravel()].reset_index(drop=True)
+    matches.insert(0, 'query', np.repeat(np.arange(len(queries)), k))
+    matches.insert(1, 'rank', np.tile(np.arange(1, k + 1), len(queries)))
+    matches.insert(2, 'distance_m', distances.ravel())
+    return matches
+
+# Function to find all indexed points within radius_m metres of each query point
+def within_radius(index, query_x, query_y, radius_m):
+    queries = np.column_stack([np.atleast_1d(query_x), np.atleast_1d(query_y)]).astype(np.float64)
+    positions, distances = index['tree'].query_radius(queries, r=radius_m, return_distance=True, sort_results=True)
+
+    counts = np.array([len(p) for p in positions])
+    flat_positions = np.concatenate(positions).astype(np.int64) if counts.sum() else np.zeros(0, dtype=np.int64)
+    matches = index['points'].iloc[flat_positions].reset_index(drop=True)
+    matches.insert(0, 'query', np.repeat(np.arange(len(queries)), counts))
+    matches.insert(1, 'distance_m', np.concatenate(distances) if counts.sum() else np.zeros(0))
+    return matches
+
+# Function to summarise a value column over each query point's radius neighbourhood
+def neighbourhood_aggregate(index, query_x, query_y, radius_m, value_column, agg='mean'):
+    n_queries = len(np.atleast_1d(query_x))
+    matches = within_radius(index, query_x, query_y, radius_m)
+    summary = matches.groupby('query')[value_column].agg(['count', agg])
+    return summary.reindex(range(n_queries)).fillna({'count': 0}).astype({'count': int})
+
+# Function for map clicks: k nearest points to a latitude/longitude
+def nearest_to_lonlat(index, lon, lat, k=5):
+    x, y = project_lonlat(lon, lat)
+    return nearest(index, x, y, k=k)
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import geopandas as gpd
 import pandas as pd
@@ -8,11 +9,26 @@ from sklearn.linear_model import LinearRegression
 import numpy as np
 from datetime import datetime
 from shapely import wkt 
+from request_coalescing import single_flight
+import spatial_queries
+import dependency_graph
 
-# Function to load traffic data from GeoJSON
+TRAFFIC_GEOJSON_PATH = "Data/Traffic Count Locations_ GeoJSON.geojson"
+TRAFFIC_CSV_PATH = "Data/Traffic.csv"
+TRAFFIC_FORECAST_FILE = 'traffic_forecast.parquet'
+
+# Function to pick the traffic source: the GeoJSON export when present, else Traffic.csv
+def traffic_source_path():
+    return TRAFFIC_GEOJSON_PATH if os.path.exists(TRAFFIC_GEOJSON_PATH) else TRAFFIC_CSV_PATH
+
+# Function to load traffic data from GeoJSON, or from Traffic.csv's VicGrid94 X/Y columns
 @st.cache_data
 def load_traffic_data(file_path):
-    gdf = gpd.read_file(file_path)
+    if file_path.endswith('.csv'):
+        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['X'], df['Y']), crs='EPSG:3111')
+    else:
+        gdf = gpd.read_file(file_path)
     
     # Ensure the CRS is correct
     if gdf.crs is None or gdf.crs.to_epsg() != 4326:
@@ -26,6 +42,16 @@ def load_traffic_data(file_path):
     
     return gdf
 
+# Function to load the forecast written by refresh_artifacts, keyed by path and mtime
+@st.cache_data
+def load_derived_forecast(path, modified):
+    return gpd.read_parquet(path)
+
+# Function to build the KD-tree over traffic count sites once per data file
+@st.cache_resource
+def load_traffic_index(file_path):
+    return spatial_queries.traffic_site_index(load_traffic_data(file_path))
+
 # Function to preprocess traffic data
 def preprocess_traffic_data(data, selected_year):
     data = data.copy()
@@ -71,6 +97,7 @@ def create_traffic_map(traffic_data):
     return m
 
 # Function to forecast traffic data for each location
+@single_flight
 def forecast_traffic_data(data, forecast_years):
     # Group data by geometry
     grouped_data = data.groupby(data.geometry.apply(lambda geom: geom.wkt))
@@ -107,12 +134,13 @@ def run():
     st.title("Traffic Data Analysis and Visualization (1985-2041)")
 
     # Load data
-    traffic_data = load_traffic_data("Data/Traffic Count Locations_ GeoJSON.geojson")
+    traffic_file = traffic_source_path()
+    traffic_data = load_traffic_data(traffic_file)
 
     st.write("Traffic Data Sample:", traffic_data[['geometry', 'LAST_YEAR', 'AADT_ALLVE']].head())
 
     # Sidebar inputs
-    available_years = sorted(traffic_data['LAST_YEAR'].unique())
+    available_years = sorted(traffic_data['LAST_YEAR'].dropna().unique())
     min_year = int(min(available_years))
     max_year = int(max(available_years))
     
@@ -121,8 +149,14 @@ def run():
     selected_year = st.sidebar.slider("Select Year", min_value=min_year, max_value=2041, value=min_year, format="%d")
 
     if selected_year > max_year:
-        forecast_years = list(range(max_year + 1, selected_year + 1))
-        forecasted_data = forecast_traffic_data(traffic_data, forecast_years)
+        # Use the forecast from the last refresh when the source hasn't changed since
+        forecast_path = dependency_graph.derived_path(TRAFFIC_FORECAST_FILE, [traffic_file])
+        if forecast_path is not None:
+            forecasted_data = load_derived_forecast(forecast_path, os.path.getmtime(forecast_path))
+            forecasted_data = forecasted_data[forecasted_data['LAST_YEAR'] <= selected_year]
+        else:
+            forecast_years = list(range(max_year + 1, selected_year + 1))
+            forecasted_data = forecast_traffic_data(traffic_data, forecast_years)
         
         if forecasted_data is not None:
             # Combine historical and forecasted data
@@ -138,12 +172,15 @@ def run():
     filtered_traffic_data = preprocess_traffic_data(extended_traffic_data, selected_year)
     
     if filtered_traffic_data is not None:
-        # Create map with traffic data
-        traffic_map = create_traffic_map(filtered_traffic_data)
-        
-        # Display map
+        # Display the map rendered by the last refresh, or render it now
         st.subheader(f"Traffic Heatmap for {selected_year}")
-        st.components.v1.html(traffic_map._repr_html_(), height=600)
+        map_path = dependency_graph.derived_path(f'traffic_map_{selected_year}.html', [traffic_file])
+        if map_path is not None:
+            with open(map_path) as f:
+                st.components.v1.html(f.read(), height=600)
+        else:
+            traffic_map = create_traffic_map(filtered_traffic_data)
+            st.components.v1.html(traffic_map._repr_html_(), height=600)
         
         # Display data summary
         st.subheader("Data Summary")
@@ -156,5 +193,17 @@ def run():
         top_locations = filtered_traffic_data.nlargest(10, 'AADT_ALLVE')
         st.bar_chart(top_locations['AADT_ALLVE'])
 
+    # Count sites around an LGA centroid, answered from the KD-tree rather than a full scan
+    st.subheader("Count Sites Near an LGA")
+    lga_index = spatial_queries.lga_centroid_index()
+    lga_points = lga_index['points'].dropna(subset=['LGA'])
+    lga = st.selectbox("Select LGA", options=sorted(lga_points['LGA'].unique()), key='traffic_lga')
+    radius_km = st.slider("Radius (km)", min_value=1, max_value=50, value=5, key='traffic_radius')
+
+    centroid = lga_points[lga_points['LGA'] == lga].iloc[0]
+    nearby_sites = spatial_queries.within_radius(load_traffic_index(traffic_file), centroid['x'], centroid['y'], radius_km * 1000)
+    st.write(f"{len(nearby_sites)} count sites within {radius_km} km of the {lga} centroid")
+    st.dataframe(nearby_sites[['distance_m', 'LAST_YEAR', 'AADT_ALLVE']])
+
 if __name__ == "__main__":
     run()
\ No newline at end of file